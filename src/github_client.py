@@ -0,0 +1,129 @@
+"""A minimal client for the parts of the github REST API this program uses.
+
+All calls share one authenticated session, so talking to github costs a request on a
+kept-alive connection instead of a gh process, a config parse, and a TLS handshake.
+
+As in issues.py, the bare word "repo" in this file means a code repo. Repos can be given
+either as "owner/name" or as a github URL."""
+
+import os
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+import orjson
+import requests
+
+from util import run
+
+API_URL = "https://api.github.com"
+# How long to wait for any single API call before giving up.
+API_TIMEOUT_S = 30
+
+_session: Optional[requests.Session] = None
+
+
+def _gh(*args: str) -> str:
+  """Runs gh with the given arguments and returns its output. Raises RuntimeError,
+  including whatever gh said about it, on any error."""
+  return run("gh", *args, env={"NO_COLOR": "1", "GH_PAGER": "cat"})
+
+
+def _get_session() -> requests.Session:
+  """Returns the shared API session, creating it on first use. Authenticates with
+  $GH_TOKEN if it's set, and otherwise with whatever gh is logged in as."""
+  global _session
+  if _session is None:
+    token = os.environ.get("GH_TOKEN") or _gh("auth", "token").strip()
+    session = requests.Session()
+    session.headers.update(
+      {
+        "Accept": "application/vnd.github+json",
+        "Authorization": f"Bearer {token}",
+        "X-GitHub-Api-Version": "2022-11-28",
+      }
+    )
+    _session = session
+  return _session
+
+
+def _repo_path(repo: str) -> str:
+  """Returns "owner/name" for a repo given as either that or its URL."""
+  if "://" in repo:
+    return urlparse(repo).path.strip("/")
+  return repo
+
+
+def _issue_api_url(issue_url: str) -> str:
+  """Returns the API URL for an issue, given its regular github URL."""
+  return f"{API_URL}/repos{urlparse(issue_url).path}"
+
+
+def _request(method: str, url: str, **kwargs) -> Any:
+  """Makes an API call and returns its decoded JSON response. Raises on any error."""
+  resp = _get_session().request(method, url, timeout=API_TIMEOUT_S, **kwargs)
+  resp.raise_for_status()
+  return orjson.loads(resp.content)
+
+
+def _issue_summary(issue: dict) -> dict[str, str]:
+  """Pulls the fields we care about out of an API issue object."""
+  return {
+    "title": issue["title"],
+    "url": issue["html_url"],
+    "createdAt": issue["created_at"],
+  }
+
+
+def search_open_issues(repo: str, title: str) -> list[dict[str, str]]:
+  """Search for open issues in the given repo matching the given title. Raises on any
+  error.
+
+  Returns a list of dicts with the title, url, and createdAt of each match."""
+  query = f'repo:{_repo_path(repo)} is:issue is:open in:title "{title}"'
+  results = _request(
+    "GET", f"{API_URL}/search/issues", params={"q": query, "per_page": 100}
+  )
+  return [_issue_summary(i) for i in results["items"]]
+
+
+def list_open_issues(repo: str) -> list[dict[str, str]]:
+  """List every open issue (but not pull request) in the given repo. Raises on any
+  error.
+
+  Returns a list of dicts with the title, url, and createdAt of each issue."""
+  issues: list[dict[str, str]] = []
+  url: Optional[str] = f"{API_URL}/repos/{_repo_path(repo)}/issues"
+  params: Optional[dict] = {"state": "open", "per_page": 100}
+  while url:
+    resp = _get_session().get(url, params=params, timeout=API_TIMEOUT_S)
+    resp.raise_for_status()
+    page = orjson.loads(resp.content)
+    issues.extend(_issue_summary(i) for i in page if "pull_request" not in i)
+    # The next page's URL already carries the query parameters.
+    url = resp.links.get("next", {}).get("url")
+    params = None
+  return issues
+
+
+def create_issue(repo: str, title: str, body: str) -> str:
+  """Create a new issue in the given repo. Raises on any error.
+
+  Returns the URL of the new issue."""
+  issue = _request(
+    "POST",
+    f"{API_URL}/repos/{_repo_path(repo)}/issues",
+    json={"title": title, "body": body},
+  )
+  return issue["html_url"]
+
+
+def edit_issue(
+  issue_url: str, body: Optional[str] = None, state: Optional[str] = None
+) -> None:
+  """Change the body and/or state of an existing issue. Raises on any error."""
+  fields = {}
+  if body is not None:
+    fields["body"] = body
+  if state is not None:
+    fields["state"] = state
+  _request("PATCH", _issue_api_url(issue_url), json=fields)
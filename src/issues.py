@@ -4,74 +4,151 @@ Note that the bare word "repo" means a package repo in most of this codebase, bu
 this file, it means a code repo."""
 
 import datetime
-import json
+import hashlib
+import time
+from functools import cache
 from typing import Optional
 
-from sh import gh
-
+import github_client
 from repos import TERMUX_TOOLS_REPO_URL
-from util import PROGRAM_NAME, doc_url
+from util import doc_url, program_name
 
+# How long to reuse the result of a search for an issue before searching again.
+SEARCH_CACHE_TTL_S = 120
 
-def search_issues(repo: str, title: str) -> Optional[str]:
-  """Search for an open issue with the given title in the given repo. Returns a URL to
-  the most recent issue matching the title, or None if no issues match."""
-  # fmt: off
-  issues_json = gh(
-    "issue", "list", "-R", repo,
-    "--json", "title,url,createdAt",
-    "--search", f"is:open {title}",
-    _tty_out=False # disables color, so we don't have to deal with those escapes
+# How long an issue can go without being edited while its contents stay the same. This
+# keeps its last updated time from looking like we've stopped paying attention.
+ISSUE_REFRESH_INTERVAL_S = 6 * 3600
+
+# Starts the title of every issue this program files.
+ISSUE_TITLE_PREFIX = "mirrors: "
+
+# Starts the line of an issue body that says when it was last updated.
+_LAST_UPDATED_PREFIX = "last updated: "
+
+# Maps (repo, title) to the time.monotonic() time a search result expires and the
+# result itself, which may be None.
+_search_cache: dict[tuple[str, str], tuple[float, Optional[str]]] = {}
+# Maps issue URLs to a hash of the body we last wrote to them, not counting the last
+# updated time, and the time.monotonic() time we wrote it.
+_last_pushed: dict[str, tuple[str, float]] = {}
+
+
+def _stable_body_hash(body: str) -> str:
+  """Returns a hash of an issue body that ignores when it was last updated."""
+  stable_body = "\n".join(
+    line for line in body.splitlines() if not line.startswith(_LAST_UPDATED_PREFIX)
   )
-  # fmt: on
-  issues = json.loads(issues_json)
-  if not issues:
-    return None
+  return hashlib.sha1(stable_body.encode()).hexdigest()
 
-  issues.sort(key=lambda i: i["createdAt"], reverse=True)
-  return issues[0]["url"]
+
+def search_issues(repo: str, title: str) -> Optional[str]:
+  """Search for an open issue with the given title in the given repo. Returns a URL to
+  the most recent issue matching the title, or None if no issues match.
+
+  Results, including finding nothing, are reused for SEARCH_CACHE_TTL_S."""
+  now = time.monotonic()
+  expired = [k for k, (expires_at, _) in _search_cache.items() if expires_at < now]
+  for k in expired:
+    del _search_cache[k]
+  if cached := _search_cache.get((repo, title)):
+    return cached[1]
+
+  issues = github_client.search_open_issues(repo, title)
+  url = None
+  if issues:
+    issues.sort(key=lambda i: i["createdAt"], reverse=True)
+    url = issues[0]["url"]
+  _search_cache[(repo, title)] = (now + SEARCH_CACHE_TTL_S, url)
+  return url
+
+
+def list_open_issues(repo: str, title_prefix: str = "") -> dict[str, str]:
+  """List every open issue in the given repo with a title starting with the given
+  prefix. Raises on any error.
+
+  Returns a dict mapping each title to the URL of the most recent open issue with that
+  title."""
+  issues = [
+    i
+    for i in github_client.list_open_issues(repo)
+    if i["title"].startswith(title_prefix)
+  ]
+  # Oldest first, so the most recent issue with any given title is the one that sticks.
+  issues.sort(key=lambda i: i["createdAt"])
+  return {i["title"]: i["url"] for i in issues}
 
 
 def open_new_issue(repo: str, title: str, body: str) -> str:
   """Create a new issue in the given repo, unconditionally. Raises on any error.
 
   Returns the URL of the new issue."""
-  output = gh("issue", "create", "-R", repo, "-t", title, "-b", body)
-  return output.splitlines()[-1]
+  url = github_client.create_issue(repo, title, body)
+  # Any cached search for this title predates the issue.
+  _search_cache.pop((repo, title), None)
+  _last_pushed[url] = (_stable_body_hash(body), time.monotonic())
+  return url
+
 
+def update_issue(url: str, body: str) -> bool:
+  """Updates the body of an existing issue. Raises on any error.
 
-def update_issue(url: str, body: str) -> None:
-  """Updates the body of an existing issue. Raises on any error."""
-  gh("issue", "edit", url, "-b", body)
+  Skips the edit if only the last updated time would change, unless the issue hasn't
+  been edited in ISSUE_REFRESH_INTERVAL_S. Returns whether the issue was edited."""
+  body_hash = _stable_body_hash(body)
+  now = time.monotonic()
+  if last_pushed := _last_pushed.get(url):
+    last_hash, last_pushed_at = last_pushed
+    if last_hash == body_hash and now - last_pushed_at < ISSUE_REFRESH_INTERVAL_S:
+      return False
+  github_client.edit_issue(url, body=body)
+  _last_pushed[url] = (body_hash, now)
+  return True
 
 
 def close_issue(url: str) -> None:
   """Closes an existing issue. Does nothing if the issue is already closed. Raises on
   any error."""
-  gh("issue", "close", url)
+  github_client.edit_issue(url, state="closed")
+  # Searches only find open issues, so any cached search that found this one is wrong.
+  for key in [k for k, (_, cached_url) in _search_cache.items() if cached_url == url]:
+    del _search_cache[key]
+  _last_pushed.pop(url, None)
 
 
 def issue_title(package_repo_domain: str) -> str:
   """Returns an issue title for the given package repo domain. This should be stable,
   and is used for determining whether there's already an issue for a problem with a
   given repo host."""
-  return f"mirrors: {package_repo_domain} is unhealthy"
+  return f"{ISSUE_TITLE_PREFIX}{package_repo_domain} is unhealthy"
 
 
-def issue_body(package_repo_domain: str, mirror_file_path: str, details: str) -> str:
-  """Returns an issue body appropriate for notifying humans of a problem."""
+@cache
+def _body_template() -> str:
+  """Returns a str.format() template for issue bodies, with everything that doesn't
+  vary between issues already filled in."""
   return f"""
-[`{PROGRAM_NAME}`🤖](https://github.com/tstein/mirror-minder) has detected an issue with \
-the package repo(s) on [`{package_repo_domain}`](https://{package_repo_domain}).
+[`{program_name()}`🤖](https://github.com/tstein/mirror-minder) has detected an issue with \
+the package repo(s) on [`{{domain}}`](https://{{domain}}).
 
-* [playbook for `{PROGRAM_NAME}` issues]({doc_url("playbook")})
-* [definition file for all repos on `{package_repo_domain}`]\
-({TERMUX_TOOLS_REPO_URL}/tree/master/{mirror_file_path})
+* [playbook for `{program_name()}` issues]({doc_url("playbook")})
+* [definition file for all repos on `{{domain}}`]\
+({TERMUX_TOOLS_REPO_URL}/tree/master/{{mirror_file_path}})
 * [search for issues and pull requests]\
-(https://github.com/termux/termux-tools/issues?q={package_repo_domain}) \
+(https://github.com/termux/termux-tools/issues?q={{domain}}) \
 mentioning this domain
 
-last updated: {datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d %H:%M:%S %Z")}
+{_LAST_UPDATED_PREFIX}{{last_updated}}
 
-{details}
+{{details}}
 """.strip()
+
+
+def issue_body(package_repo_domain: str, mirror_file_path: str, details: str) -> str:
+  """Returns an issue body appropriate for notifying humans of a problem."""
+  return _body_template().format(
+    domain=package_repo_domain,
+    mirror_file_path=mirror_file_path,
+    last_updated=datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%d %H:%M:%S %Z"),
+    details=details,
+  )
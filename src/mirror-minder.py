@@ -1,8 +1,8 @@
 #!/usr/bin/env python
 # /// script
 # dependencies = [
+#   "orjson",
 #   "requests",
-#   "sh",
 # ]
 # ///
 """Continuously monitor Termux repo mirrors for freshness. Files Github issues if the
@@ -20,21 +20,26 @@ Major TODOs:
 """
 
 import argparse
+import heapq
 import logging
-import os
-import os.path
 import random
+import re
 import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, UTC
-from typing import Optional
+from itertools import chain, count
+from typing import Callable, Optional
 
 import requests
-import sh
+from requests.adapters import HTTPAdapter
 
 from issues import (
+  ISSUE_TITLE_PREFIX,
   close_issue,
   issue_body,
   issue_title,
+  list_open_issues,
   open_new_issue,
   search_issues,
   update_issue,
@@ -75,24 +80,91 @@ CONSECUTIVE_FAIL_LIMIT = round(timedelta(days=3) / CHECK_INTERVAL)
 # should be generous: the `main` Release is around 13 KiB, and this timeout should
 # represent a so-slow-it's-basically-stalled level of throughput.
 RELEASE_RETRIEVAL_LIMIT_S = 120
+# How much of a Release file to ask for at first. The sync time is within the first few
+# hundred bytes, and the checksums that make up the rest of the file aren't interesting.
+RELEASE_HEAD_BYTES = 4096
+# How many mirror checks to run at once. Checks spend nearly all their time waiting on
+# the network, so this mostly bounds how many connections we have open at a time.
+MAX_CONCURRENT_CHECKS = 32
+# How long to wait for a round of checks to finish before judging mirror groups without
+# the stragglers. This counts from when the checks are queued, and one check can make
+# two requests, each of which can spend RELEASE_RETRIEVAL_LIMIT_S connecting and more
+# reading. It's long enough that only truly hung checks are left behind, since a check
+# that merely times out should be judged like any other failure.
+ROUND_TIME_LIMIT_S = 3 * RELEASE_RETRIEVAL_LIMIT_S
+# Between rounds of checks, we sleep until the next mirror is due, but for no less than
+# the min, and no more than the max so we notice the end of a monitoring period
+# promptly.
+MIN_IDLE_SLEEP_S = 0.5
+MAX_IDLE_SLEEP_S = 60.0
+# How many mirror hosts to keep connections open to between checks. This should be more
+# than the number of mirror hosts, so none of them have to reconnect every round.
+HOSTS_TO_KEEP_CONNECTED = 64
+# How many connections to keep open to any one host. The package repos on a host are
+# checked at the same time, so this should cover the most repos any host serves.
+CONNECTIONS_PER_HOST = 8
 # Whether we should automatically close open issues when the mirrors they cover go green.
 AUTO_CLOSE = False
+# How long we trust our list of open issues before fetching it again.
+OPEN_ISSUES_CACHE_TTL = timedelta(seconds=60)
 
 REPORTING_CODE_REPO = TERMUX_TOOLS_REPO_URL
 
 # Headers to use in all HTTP requests.
 BASE_HEADERS = {"User-Agent": "Debian APT-HTTP/1.3 (0.0.0+really-mirror-minder)"}
 
+
+def _make_release_session() -> requests.Session:
+  """Returns a session with connection pools sized for checking every mirror."""
+  session = requests.Session()
+  session.headers.update(BASE_HEADERS)
+  for prefix in ("http://", "https://"):
+    session.mount(
+      prefix,
+      HTTPAdapter(
+        pool_connections=HOSTS_TO_KEEP_CONNECTED, pool_maxsize=CONNECTIONS_PER_HOST
+      ),
+    )
+  return session
+
+
+# Used for all Release file retrievals. Checks of package repos on the same host share
+# kept-alive connections, within a round of checks and across rounds.
+RELEASE_SESSION = _make_release_session()
+
+# Matches the line of a Release file giving its sync time, capturing the time. Only
+# horizontal whitespace is skipped, so an empty Date line can't capture the next line.
+DATE_LINE_RE = re.compile(rb"^Date:[ \t]*(.+?)\s*$", re.MULTILINE)
+
+# Abbreviated month names as they appear in Release file sync times, which are always in
+# English regardless of locale.
+# fmt: off
+_MONTH_NAMES = (
+  "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
+)
+# fmt: on
+_MONTHS = {name: number for number, name in enumerate(_MONTH_NAMES, start=1)}
+
 #############################
 # argument-controlled state #
 #############################
 LOG_ONLY = False
 
+#######################
+# cached github state #
+#######################
+# Maps the titles of open issues this program filed in REPORTING_CODE_REPO to their
+# URLs. Only meaningful while _open_issues_cached_at is set.
+_open_issues_cache: dict[str, str] = {}
+_open_issues_cached_at: Optional[datetime] = None
+
 
 def extract_authoritative_mirrors(
   mirror_groups: list[MirrorGroup],
 ) -> dict[str, Mirror]:
-  """Takes a list of mirror groups and extracts the authoritative mirrors for each repo.
+  """Takes a list of mirror groups and extracts the authoritative mirrors for each repo,
+  pointing every mirror at the authority for its repo and scheduling the authorities to
+  be checked first.
 
   Returns a dict mapping repo names (e.g. "main") to the appropriate Mirrors."""
   authorities = {}
@@ -103,38 +175,96 @@ def extract_authoritative_mirrors(
         # authorities.
         assert mirror.repo_name not in authorities
         authorities[mirror.repo_name] = mirror
+        logging.info(
+          f"identified authority for repo_name={mirror.repo_name}, repo_url={mirror.repo_url}"
+        )
+        # Authorities remain in the all-mirrors list so we can monitor them with the
+        # same logic as secondaries, but we can avoid some log noise by making sure
+        # they're checked first.
+        mirror.next_check = datetime.fromtimestamp(0, UTC)
   logging.info(f"extracted authoritative mirrors: {authorities}")
+  for mirror_group in mirror_groups:
+    for mirror in mirror_group.mirrors:
+      mirror.authority = authorities.get(mirror.repo_name)
   return authorities
 
 
-def check_and_update_mirror(mirror: Mirror) -> Mirror:
+def parse_sync_time(sync_time_str: str) -> datetime:
+  """Parse a sync time like "Tue, 3 Jun 2025 06:18:01 UTC" into a datetime in UTC.
+  Raises ValueError if it doesn't look like that.
+
+  This is a fixed format, so taking it apart by hand is much cheaper than strptime()."""
+  weekday, day, month_name, year, time_of_day, tz = sync_time_str.split()
+  if not weekday.endswith(",") or tz != "UTC":
+    raise ValueError(f"unexpected sync time format: {sync_time_str}")
+  month = _MONTHS.get(month_name)
+  if month is None:
+    raise ValueError(f"unknown month in sync time: {sync_time_str}")
+  hour, minute, second = time_of_day.split(":")
+  return datetime(
+    int(year), month, int(day), int(hour), int(minute), int(second), tzinfo=UTC
+  )
+
+
+def check_and_update_mirror(mirror: Mirror, now: datetime) -> Mirror:
   """Retrieve the given mirror's release file and parse a last sync time out of it.
-  Update the state in the Mirror with our success or failure. Returns the same Mirror
-  object that was passed in, but only so the type checker will yell if this doesn't
-  explicitly signal failure or success."""
+  Update the state in the Mirror with our success or failure, recording it as a check
+  made at `now`. Returns the same Mirror object that was passed in, but only so the type
+  checker will yell if this doesn't explicitly signal failure or success."""
 
   def fail(mirror) -> Mirror:
-    mirror.last_check = datetime.now(UTC)
+    mirror.last_check = now
     mirror.consecutive_check_failures += 1
-    mirror.next_check = next_check_time()
+    mirror.next_check = next_check_time(now=now)
     return mirror
 
   def succeed(mirror, sync_time, release_url) -> Mirror:
-    mirror.last_check = datetime.now(UTC)
-    mirror.last_successful_check = datetime.now(UTC)
+    mirror.last_check = now
+    mirror.last_successful_check = now
     mirror.last_sync_time = sync_time
     mirror.consecutive_check_failures = 0
-    mirror.next_check = next_check_time()
+    mirror.next_check = next_check_time(now=now)
     logging.info(f"successfully retrieved {release_url}")
     logging.debug(f"mirror={mirror}")
     return mirror
 
+  def succeed_unchanged(mirror, release_url) -> Mirror:
+    # The mirror says its Release file hasn't changed, so neither has its sync time.
+    mirror.last_check = now
+    mirror.last_successful_check = now
+    mirror.consecutive_check_failures = 0
+    mirror.next_check = next_check_time(now=now)
+    logging.info(f"successfully confirmed {release_url} is unchanged")
+    logging.debug(f"mirror={mirror}")
+    return mirror
+
   release_url = mirror.release_url()
+  # Anything here is sent on top of the session's headers.
+  headers: dict[str, str] = {}
+  # If we know the last sync time, we only need the Release file if it's changed since.
+  if mirror.last_sync_time:
+    if mirror.last_etag:
+      headers["If-None-Match"] = mirror.last_etag
+    if mirror.last_modified:
+      headers["If-Modified-Since"] = mirror.last_modified
+  # The sync time is near the top, so start by asking for only the head of the file.
+  head_headers = {**headers, "Range": f"bytes=0-{RELEASE_HEAD_BYTES - 1}"}
+  date_match = None
   start = time.monotonic()
   try:
-    release_req = requests.get(
-      release_url, headers=BASE_HEADERS, timeout=RELEASE_RETRIEVAL_LIMIT_S
+    release_req = RELEASE_SESSION.get(
+      release_url, headers=head_headers, timeout=RELEASE_RETRIEVAL_LIMIT_S
     )
+    if release_req.status_code == 206:
+      # The last line of a partial file is probably cut off, so only look at complete
+      # ones.
+      content = release_req.content
+      date_match = DATE_LINE_RE.search(content, 0, content.rfind(b"\n") + 1)
+      if not date_match:
+        logging.info(f"no sync time in the head of {release_url}, retrieving it all")
+        release_req = RELEASE_SESSION.get(
+          release_url, headers=headers, timeout=RELEASE_RETRIEVAL_LIMIT_S
+        )
   except requests.exceptions.ConnectionError:
     if time.monotonic() - start > RELEASE_RETRIEVAL_LIMIT_S:
       logging.error(f"connect timeout for {release_url}")
@@ -152,43 +282,81 @@ def check_and_update_mirror(mirror: Mirror) -> Mirror:
     logging.exception(f"unhandled requests exception for {release_url}")
     return fail(mirror)
 
-  if release_req.status_code != 200:
+  # We only make conditional requests when we know the last sync time, so only trust a
+  # 304 when we do.
+  if release_req.status_code == 304 and mirror.last_sync_time:
+    # A 304 can carry updated validators for the same content.
+    mirror.last_etag = release_req.headers.get("ETag", mirror.last_etag)
+    mirror.last_modified = release_req.headers.get(
+      "Last-Modified", mirror.last_modified
+    )
+    return succeed_unchanged(mirror, release_url)
+  if release_req.status_code == 200:
+    # Mirrors are free to ignore the range and send the whole file.
+    date_match = DATE_LINE_RE.search(release_req.content)
+  elif release_req.status_code != 206:
     logging.warning(f"retrieving {release_url} returned HTTP {release_req.status_code}")
     logging.debug(f"mirror={mirror}")
     return fail(mirror)
 
-  for line in release_req.text.splitlines():
-    if line.startswith("Date:"):
-      # This is a sync time. line looks like this: "Date: Tue, 3 Jun 2025 06:18:01 UTC"
-      # Assumes:
-      #   it is explicitly in UTC
-      #   it uses abbreviated month names
-      try:
-        sync_time_str = line.strip("Date: ").split(", ")[1]
-        # strptime() can understand a TZ name of "UTC", but that produces a naive
-        # (non-offset-aware) datetime, and this program deals entirely in offset-aware
-        # datetimes. By replacing the string UTC with a numerical offset and using %z
-        # instead of %Z, we get an offset-aware TZ.
-        if sync_time_str.endswith(" UTC"):
-          sync_time_str = sync_time_str.replace(" UTC", "+0000")
-        else:
-          logging.error(f"sync time for {release_url} not in UTC: {sync_time_str}")
-          continue
-        sync_time = datetime.strptime(sync_time_str, "%d %b %Y %H:%M:%S%z")
-        return succeed(mirror, sync_time, release_url)
-      except ValueError:
-        logging.exception(
-          f"retrieved release file at {release_url}, but couldn't parse the sync time"
-        )
-        logging.debug(f"mirror={mirror}")
-        return fail(mirror)
+  # The sync time is on a line that looks like this:
+  #   "Date: Tue, 3 Jun 2025 06:18:01 UTC"
+  # Only the first such line counts.
+  if not date_match:
+    logging.error(
+      f"retrieved release file at {release_url}, but couldn't find a sync time"
+    )
+    logging.debug(f"mirror={mirror}")
+    return fail(mirror)
 
-  # We didn't find a sync time in the release file. Treat this as a failure.
-  logging.error(
-    f"retrieved release file at {release_url}, but couldn't find a sync time"
-  )
-  logging.debug(f"mirror={mirror}")
-  return fail(mirror)
+  # Assumes:
+  #   it is explicitly in UTC
+  #   it uses abbreviated day and month names
+  sync_time_str = date_match.group(1).decode(errors="replace")
+  if not sync_time_str.endswith(" UTC"):
+    logging.error(f"sync time for {release_url} not in UTC: {sync_time_str}")
+    return fail(mirror)
+  try:
+    sync_time = parse_sync_time(sync_time_str)
+  except ValueError:
+    logging.exception(
+      f"retrieved release file at {release_url}, but couldn't parse the sync time"
+    )
+    logging.debug(f"mirror={mirror}")
+    return fail(mirror)
+  mirror.last_etag = release_req.headers.get("ETag")
+  mirror.last_modified = release_req.headers.get("Last-Modified")
+  return succeed(mirror, sync_time, release_url)
+
+
+def refresh_open_issues_cache() -> None:
+  """Fetch the open issues in the configured repo if our copy is older than
+  OPEN_ISSUES_CACHE_TTL. If fetching fails, the cache is unusable until a later refresh
+  succeeds, and lookups fall back to searching."""
+  global _open_issues_cache, _open_issues_cached_at
+  if LOG_ONLY:
+    return
+  now = datetime.now(UTC)
+  if _open_issues_cached_at and now - _open_issues_cached_at < OPEN_ISSUES_CACHE_TTL:
+    return
+
+  try:
+    _open_issues_cache = list_open_issues(REPORTING_CODE_REPO, ISSUE_TITLE_PREFIX)
+    _open_issues_cached_at = now
+    logging.debug(f"open_issues={_open_issues_cache}")
+  except (ValueError, requests.RequestException, RuntimeError):
+    logging.exception("something went wrong listing open issues on github")
+    _open_issues_cache = {}
+    _open_issues_cached_at = None
+
+
+def find_open_issue(title: str) -> Optional[str]:
+  """Returns the URL of the open issue in the configured repo with the given title, or
+  None if there isn't one. Uses the cached open issues if we have them, and searches for
+  the title if we don't. Raises on any error."""
+  if _open_issues_cached_at is not None:
+    return _open_issues_cache.get(title)
+  return search_issues(REPORTING_CODE_REPO, title)
 
 
 def update_github_issue(
@@ -201,15 +369,17 @@ def update_github_issue(
   if LOG_ONLY:
     logging.warning(f"would update issue, but running log-only:\n{title}\n{body}")
     return
-
   try:
-    if url := search_issues(REPORTING_CODE_REPO, title):
-      update_issue(url, body)
-      logging.info(f"updated existing issue: {url}")
+    if url := find_open_issue(title):
+      if update_issue(url, body):
+        logging.info(f"updated existing issue: {url}")
+      else:
+        logging.info(f"details unchanged, not updating issue: {url}")
     elif create:
       issue_url = open_new_issue(REPORTING_CODE_REPO, title, body)
+      _open_issues_cache[title] = issue_url
       logging.warning(f"created issue {issue_url}")
-  except (ValueError, sh.ErrorReturnCode):
+  except (ValueError, requests.RequestException, RuntimeError):
     logging.exception("something went wrong communicating with github")
 
 
@@ -221,32 +391,37 @@ def close_github_issue(repo_domain: str, mirror_file_path: str, details: str) ->
   if LOG_ONLY:
     logging.warning(f"would close issue, but running log-only:\n{title}\n{body}")
     return
-
   try:
-    if url := search_issues(REPORTING_CODE_REPO, title):
+    if url := find_open_issue(title):
       update_issue(url, body)
       close_issue(url)
+      _open_issues_cache.pop(title, None)
       logging.info(f"closed issue: {url}")
-  except (ValueError, sh.ErrorReturnCode):
+  except (ValueError, requests.RequestException, RuntimeError):
     logging.exception("something went wrong communicating with github")
 
 
 def judge_mirror(
-  mirror: Mirror, authority: Optional[Mirror]
-) -> tuple[Optional[bool], str]:
-  """Decide if a mirror looks unhealthy and return an explanation of why or why not.
+  mirror: Mirror, now: datetime
+) -> tuple[Optional[bool], Callable[[], str]]:
+  """Decide if a mirror looks unhealthy as of `now` and return a function that explains
+  why or why not. The explanation is only rendered if it's called, since it's only
+  needed when there's an issue to file or update.
 
   Returns Optional[bool] for each mirror because the decision here is trinary - the
   mirror is healthy, unhealthy, or indeterminate."""
   # If we're trying to judge an authority, it's a bug.
   assert not mirror.is_authoritative()
+  authority = mirror.authority
 
   # We need to know if we are failing to monitor the mirror.
   if mirror.consecutive_check_failures >= CONSECUTIVE_FAIL_LIMIT:
     return (
       False,
-      f"⭕ retrieving it failed {mirror.consecutive_check_failures} times in a row, "
-      f"last successful retrieval was {mirror.last_successful_check or '`<never>`'}",
+      lambda: (
+        f"⭕ retrieving it failed {mirror.consecutive_check_failures} times in a row, "
+        f"last successful retrieval was {mirror.last_successful_check or '`<never>`'}"
+      ),
     )
   if mirror.consecutive_check_failures:
     alert_eta = (
@@ -258,10 +433,12 @@ def judge_mirror(
     )
     return (
       None,
-      f"🟨 retrieving it failed {mirror.consecutive_check_failures} times in a row "
-      f"(about `{readable_timedelta(alert_eta)}` until it exceeds the unavailability "
-      "limit) - last successful retrieval was "
-      f"{mirror.last_successful_check or '`<never>`'}",
+      lambda: (
+        f"🟨 retrieving it failed {mirror.consecutive_check_failures} times in a row "
+        f"(about `{readable_timedelta(alert_eta)}` until it exceeds the unavailability "
+        "limit) - last successful retrieval was "
+        f"{mirror.last_successful_check or '`<never>`'}"
+      ),
     )
 
   # Both of these cases should be prevented by ordering and filtering above this
@@ -272,18 +449,18 @@ def judge_mirror(
   if not mirror.last_sync_time:
     return (
       None,
-      "⁉️ mirror has never been checked (and it's a bug if you're seeing this)",
+      lambda: "⁉️ mirror has never been checked (and it's a bug if you're seeing this)",
     )
   # 2. Authority freshness needs to be handled separately.
   if not authority or not authority.last_sync_time:
     return (
       None,
-      "⁉️ authority freshness unknown (and it's a bug if you're seeing this)",
+      lambda: "⁉️ authority freshness unknown (and it's a bug if you're seeing this)",
     )
 
   # This is the freshness check we're all here for.
   staleness = authority.last_sync_time - mirror.last_sync_time
-  authority_age = datetime.now(UTC) - authority.last_sync_time
+  authority_age = now - authority.last_sync_time
   logging.info(
     f"{mirror.repo_url}: staleness={staleness}, "
     f"authority_age={readable_timedelta(authority_age)}, "
@@ -296,70 +473,78 @@ def judge_mirror(
     if authority_age < AUTHORITY_UPDATE_GRACE_PERIOD:
       return (
         None,
-        f"🟨 (in grace period) hasn't synced since {mirror.last_sync_time}: "
-        f"`{readable_timedelta(staleness)}` older than "
-        f"[its authority]({authority.repo_url}), but its authority was updated only "
-        f"`{readable_timedelta(authority_age)}` ago",
+        lambda: (
+          f"🟨 (in grace period) hasn't synced since {mirror.last_sync_time}: "
+          f"`{readable_timedelta(staleness)}` older than "
+          f"[its authority]({authority.repo_url}), but its authority was updated only "
+          f"`{readable_timedelta(authority_age)}` ago"
+        ),
       )
     else:
       return (
         False,
-        f"⭕ hasn't synced since {mirror.last_sync_time}: "
-        f"`{readable_timedelta(staleness)}` older than "
-        f"[its authority]({authority.repo_url}), which was updated "
-        f"`{readable_timedelta(authority_age)}` ago",
+        lambda: (
+          f"⭕ hasn't synced since {mirror.last_sync_time}: "
+          f"`{readable_timedelta(staleness)}` older than "
+          f"[its authority]({authority.repo_url}), which was updated "
+          f"`{readable_timedelta(authority_age)}` ago"
+        ),
       )
   elif staleness > FRESHNESS_TARGET:
     return (
       True,
-      f"🟨 (below alert threshold) hasn't synced since {mirror.last_sync_time}: "
-      f"`{readable_timedelta(staleness)}` older than "
-      f"[its authority]({authority.repo_url}), which was updated "
-      f"`{readable_timedelta(authority_age)}` ago",
+      lambda: (
+        f"🟨 (below alert threshold) hasn't synced since {mirror.last_sync_time}: "
+        f"`{readable_timedelta(staleness)}` older than "
+        f"[its authority]({authority.repo_url}), which was updated "
+        f"`{readable_timedelta(authority_age)}` ago"
+      ),
     )
   else:
     # No problem at all.
     return (
       True,
-      f"🟢 looks good, last synced {mirror.last_sync_time}: "
-      f"`{readable_timedelta(staleness)}` older than "
-      f"[its authority]({authority.repo_url}), which was updated "
-      f"`{readable_timedelta(authority_age)}` ago",
+      lambda: (
+        f"🟢 looks good, last synced {mirror.last_sync_time}: "
+        f"`{readable_timedelta(staleness)}` older than "
+        f"[its authority]({authority.repo_url}), which was updated "
+        f"`{readable_timedelta(authority_age)}` ago"
+      ),
     )
 
 
-def judge_mirror_group(group: MirrorGroup, authorities: dict[str, Mirror]) -> None:
+def judge_mirror_group(group: MirrorGroup) -> None:
   """Decide if a mirror group looks unhealthy and do something useful if it does.
 
   Does nothing if we haven't attempted to check every mirror in the group recently."""
 
+  now = datetime.now(UTC)
+
   def is_recent(last_check) -> bool:
     if last_check is None:
       return False
-    return datetime.now(UTC) - last_check < (2 * CHECK_INTERVAL)
+    return now - last_check < (2 * CHECK_INTERVAL)
 
-  if not all([is_recent(m.last_check) for m in group.mirrors]):
+  if not all(is_recent(m.last_check) for m in group.mirrors):
     logging.info(
       f"not judging mirror group at {group.domain} until all mirrors have been checked "
       "recently"
     )
     return
 
-  explanations: list[tuple[Mirror, Optional[bool], str]] = []
+  explanations: list[tuple[Mirror, Optional[bool], Callable[[], str]]] = []
   for mirror in group.mirrors:
     # This path judges mirrors against authorities. It does not handle authority issues.
     if mirror.is_authoritative():
       continue
-    mirror_healthy, explanation = judge_mirror(
-      mirror, authorities.get(mirror.repo_name)
-    )
+    mirror_healthy, explanation = judge_mirror(mirror, now)
     explanations.append((mirror, mirror_healthy, explanation))
   if not explanations:
     logging.info(f"not judging group for {group.domain}")
     return
 
-  any_red = any([mirror_healthy is False for _, mirror_healthy, _ in explanations])
-  all_green = all([mirror_healthy is True for _, mirror_healthy, _ in explanations])
+  any_red = any(mirror_healthy is False for _, mirror_healthy, _ in explanations)
+  all_green = all(mirror_healthy is True for _, mirror_healthy, _ in explanations)
   short_mirror_health = ", ".join(
     [f"{m.repo_name} health={h}" for m, h, _ in explanations]
   )
@@ -367,6 +552,15 @@ def judge_mirror_group(group: MirrorGroup, authorities: dict[str, Mirror]) -> No
     f"judged group for {group.domain}, any_red={any_red}, all_green={all_green}: {short_mirror_health}"
   )
 
+  # Rendering the details is most of the work of judging a group, and a group with no
+  # red and no open issue has nowhere for them to go.
+  if (
+    not any_red
+    and _open_issues_cached_at is not None
+    and issue_title(group.domain) not in _open_issues_cache
+  ):
+    return
+
   def p(mirror, explanation):
     return f"""
 ## {mirror.repo_name}
@@ -376,7 +570,7 @@ def judge_mirror_group(group: MirrorGroup, authorities: dict[str, Mirror]) -> No
 links: [repo root]({mirror.repo_url}), [`Release`]({mirror.release_url()})
 """.strip()
 
-  detail_parts = [p(m, e) for (m, _, e) in explanations]
+  detail_parts = [p(m, e()) for (m, _, e) in explanations]
   details = "\n".join(detail_parts)
 
   # If everything looks good and auto-closure is enabled, close any open issue.
@@ -388,42 +582,88 @@ links: [repo root]({mirror.repo_url}), [`Release`]({mirror.release_url()})
     update_github_issue(group.domain, group.mirror_file_path, details, create=any_red)
 
 
-def monitor_mirrors_for_a_while(monitor_period_s: float) -> None:
-  """Update the mirror definitions, load the cache, and then monitor mirrors for a
-  while. No is state persisted between calls to this function except via the cache."""
+def monitor_mirrors_for_a_while(workdir: str, monitor_period_s: float) -> None:
+  """Update the mirror definitions in the workdir, load the cache, and then monitor
+  mirrors for a while. No is state persisted between calls to this function except via
+  the cache."""
   # Load and process mirrors.
-  clone_or_update_termux_tools_repo()
-  mirror_groups = load_mirrors()
-  authorities = extract_authoritative_mirrors(mirror_groups)
-  # Authorities remain in the all-mirrors list so we can monitor them with the same
-  # logic as secondaries, but we can avoid some log noise by making sure they're checked
-  # first.
-  for group in mirror_groups:
-    for mirror in group.mirrors:
-      if mirror.is_authoritative():
-        logging.info(
-          f"identified authority for repo_name={mirror.repo_name}, repo_url={mirror.repo_url}"
-        )
-        mirror.next_check = datetime.fromtimestamp(0, UTC)
-
-  # Enter a finite loop of mirror monitoring.
-  start = time.monotonic()
-  while time.monotonic() - start < monitor_period_s:
-    time.sleep(0.1)
-    now = datetime.now(UTC)
-    for group in mirror_groups:
-      did_anything = False
-      for mirror in group.mirrors:
-        if mirror.next_check < now:
-          _ = check_and_update_mirror(mirror)
-          did_anything = True
-
-      if did_anything:
-        judge_mirror_group(group, authorities)
+  clone_or_update_termux_tools_repo(workdir)
+  mirror_groups = load_mirrors(workdir)
+  extract_authoritative_mirrors(mirror_groups)
+
+  # Mirrors in the order they're due to be checked, along with their groups. Keyed on
+  # POSIX timestamps, which are much cheaper to compare than aware datetimes. The
+  # counter breaks ties, since neither Mirrors nor MirrorGroups can be ordered.
+  tiebreak = count()
+  schedule = [
+    (m.next_check.timestamp(), next(tiebreak), m, g)
+    for g in mirror_groups
+    for m in g.mirrors
+  ]
+  heapq.heapify(schedule)
+
+  # Enter a finite loop of mirror monitoring. Due mirrors are checked concurrently, so
+  # one slow mirror doesn't hold up checks of all the others.
+  # Checks that haven't finished, including any still running from earlier rounds that
+  # we stopped waiting for. Their mirrors are off the schedule until they finish, so
+  # they're never checked twice at once.
+  in_flight: dict[Future[Mirror], tuple[Mirror, MirrorGroup]] = {}
+  with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CHECKS) as executor:
+    start = time.monotonic()
+    while time.monotonic() - start < monitor_period_s:
+      now_ts = time.time()
+      now = datetime.fromtimestamp(now_ts, UTC)
+      this_round: set[Future[Mirror]] = set()
+      due_groups: dict[int, MirrorGroup] = {}
+      while schedule and schedule[0][0] < now_ts:
+        _, _, mirror, group = heapq.heappop(schedule)
+        future = executor.submit(check_and_update_mirror, mirror, now)
+        in_flight[future] = (mirror, group)
+        this_round.add(future)
+        due_groups[id(group)] = group
+      if in_flight:
+        # Judge each group as soon as its own checks are done, rather than after every
+        # check in the round. Groups aren't hashable, so count by id.
+        unchecked = Counter(id(g) for _, g in in_flight.values())
+        refresh_open_issues_cache()
+        # Stragglers from earlier rounds are collected if they're done, but never
+        # waited on again.
+        stragglers = [f for f in in_flight if f.done() and f not in this_round]
+        try:
+          for future in chain(
+            stragglers, as_completed(this_round, timeout=ROUND_TIME_LIMIT_S)
+          ):
+            # Raises here if the check raised.
+            future.result()
+            mirror, group = in_flight.pop(future)
+            entry = (mirror.next_check.timestamp(), next(tiebreak), mirror, group)
+            heapq.heappush(schedule, entry)
+            unchecked[id(group)] -= 1
+            if not unchecked[id(group)]:
+              judge_mirror_group(group)
+        except TimeoutError:
+          for future in this_round:
+            # Checks still queued behind others haven't had a chance to stall.
+            if future in in_flight and future.running():
+              logging.warning(
+                f"still checking {in_flight[future][0].repo_url} after "
+                f"{ROUND_TIME_LIMIT_S}s, moving on"
+              )
+        # Stalled checks can't be interrupted, so leave them running and judge the
+        # groups they're holding up on everything else we know.
+        for group_id, group in due_groups.items():
+          if unchecked[group_id]:
+            judge_mirror_group(group)
         maybe_write_cache(mirror_groups)
 
-  # Write the cache one more time, just for cleanliness.
-  maybe_write_cache(mirror_groups)
+      # Sleep until the next mirror is due, within limits.
+      sleep_s = MAX_IDLE_SLEEP_S
+      if schedule:
+        sleep_s = schedule[0][0] - time.time()
+      time.sleep(max(MIN_IDLE_SLEEP_S, min(MAX_IDLE_SLEEP_S, sleep_s)))
+
+  # Cache writes are throttled, so make sure the final state makes it to disk.
+  maybe_write_cache(mirror_groups, force=True)
 
 
 def main() -> None:
@@ -453,7 +693,6 @@ def main() -> None:
   if args.log_only:
     logging.warning("running in log-only mode")
     LOG_ONLY = True
-  os.chdir(args.WORKDIR)
 
   while True:
     # Choose a jitter fraction in [-.1, .1).
@@ -461,7 +700,7 @@ def main() -> None:
       MONITOR_PERIOD_S + ((random.random() * 2) - 1) * (MONITOR_PERIOD_S / 10)
     )
     logging.info(f"monitoring mirrors for {monitor_period_s} seconds")
-    monitor_mirrors_for_a_while(monitor_period_s)
+    monitor_mirrors_for_a_while(args.WORKDIR, monitor_period_s)
 
 
 if __name__ == "__main__":
@@ -1,27 +1,61 @@
+import hashlib
 import logging
 import os
 import pickle
 import random
-from dataclasses import dataclass
+import re
+from dataclasses import MISSING, dataclass, field, fields
 from datetime import datetime, timedelta, UTC
-from itertools import chain
+from functools import cache
 from typing import Optional, Self
 
-from sh import git
-
-from util import PROGRAM_NAME
+from util import program_name, run
 
 # Approximately how long to wait after startup before the initial checks of each mirror.
 INITIAL_CHECK_DELAY = timedelta(seconds=30)
 # Approximately how long to wait between checks after the initial round.
 CHECK_INTERVAL = timedelta(minutes=60)
 CHECK_JITTER_FRACTION = 0.05
+# Approximately how often to write the mirror cache while monitoring.
+CACHE_WRITE_INTERVAL = timedelta(minutes=5)
 
 TERMUX_TOOLS_REPO = "termux-tools"
 TERMUX_TOOLS_REPO_URL = f"https://github.com/termux/{TERMUX_TOOLS_REPO}"
 
-
-@dataclass
+# Matches every line of a mirror definition file. Assignments, like `MAIN="https://..."`
+# or `WEIGHT=1`, capture the variable and its value without any quotes. Blank lines and
+# comments capture nothing, and any other line is captured whole as unparseable.
+_MIRROR_LINE = re.compile(
+  r"""
+  ^[ \t]*
+  (?:
+    (?P<var>\w+)[ \t]*=[ \t]*"?(?P<val>[^"\n]*?)"?
+    | \#.*
+    | (?P<unparseable>.*?\S)
+  )?
+  [ \t]*$
+  """,
+  re.MULTILINE | re.VERBOSE,
+)
+
+# When we last wrote the mirror cache. None means we haven't written it yet.
+_last_cache_write: Optional[datetime] = None
+# A hash of what we last wrote to the mirror cache.
+_last_cache_hash: Optional[bytes] = None
+
+
+def _restore_fields(obj, state: dict) -> None:
+  """Sets every dataclass field of obj from the pickled state, falling back to the
+  field's default for anything the state doesn't have. Used to unpickle the slotted
+  dataclasses, which can't have a __dict__ updated for them."""
+  for f in fields(obj):
+    if f.name in state:
+      setattr(obj, f.name, state[f.name])
+    elif f.default is not MISSING:
+      setattr(obj, f.name, f.default)
+
+
+@dataclass(slots=True)
 class Mirror:
   """Represents a single mirror of a single package repo. Different repos (in apt terms)
   are different mirrors (in terms of this class).
@@ -52,6 +86,30 @@ class Mirror:
   # The last sync time reported by the last successful pull and parse of the mirror's
   # release file. None means we have never done that.
   last_sync_time: Optional[datetime]
+  # The ETag and Last-Modified headers sent with the Release file we last parsed, for
+  # making conditional requests. None means the mirror didn't send one, or we have never
+  # parsed its Release file. These have defaults so caches from before they existed
+  # still load.
+  last_etag: Optional[str] = None
+  last_modified: Optional[str] = None
+
+  ###################
+  # Derived at load #
+  ###################
+  # The authoritative mirror for this mirror's repo, or None if there isn't one. This is
+  # rediscovered on every load, so it's left out of the cache.
+  authority: Optional["Mirror"] = field(
+    default=None, init=False, repr=False, compare=False
+  )
+
+  def __getstate__(self) -> dict:
+    """Pickle everything but the fields that are derived at load."""
+    return {
+      f.name: getattr(self, f.name) for f in fields(self) if f.name != "authority"
+    }
+
+  def __setstate__(self, state: dict) -> None:
+    _restore_fields(self, state)
 
   def update_from(self, other: Self) -> None:
     """Load all mirror-checking state from the other mirror object into this one."""
@@ -60,6 +118,8 @@ class Mirror:
     self.last_check = other.last_check
     self.last_successful_check = other.last_successful_check
     self.last_sync_time = other.last_sync_time
+    self.last_etag = other.last_etag
+    self.last_modified = other.last_modified
 
   def is_authoritative(self) -> bool:
     """Mirror freshness needs to be determined against an authoritative mirror, not the
@@ -76,7 +136,7 @@ class Mirror:
     return f"{self.repo_url}/dists/{repo_path}/Release"
 
 
-@dataclass
+@dataclass(slots=True)
 class MirrorGroup:
   """Represents a group of mirrors behind the same domain. Failures, and particularly
   failures-to-monitor, are likely to be correlated among repos hosted in the same place,
@@ -88,55 +148,77 @@ class MirrorGroup:
   mirror_file_path: str
   mirrors: list[Mirror]
 
+  def __getstate__(self) -> dict:
+    return {f.name: getattr(self, f.name) for f in fields(self)}
+
+  def __setstate__(self, state: dict) -> None:
+    _restore_fields(self, state)
 
-def next_check_time(delay: Optional[timedelta] = None) -> datetime:
+
+def next_check_time(
+  delay: Optional[timedelta] = None, now: Optional[datetime] = None
+) -> datetime:
   """Chooses a time to check something. Jittered.
 
-  If no delay is passed, defaults to the configured interval."""
+  If no delay is passed, defaults to the configured interval. The delay is counted from
+  `now`, or from the current time if that isn't passed."""
   if not delay:
     delay = CHECK_INTERVAL
+  if not now:
+    now = datetime.now(UTC)
 
   # Choose a jitter factor in [-1, 1).
   jitter = ((random.random() * 2) - 1) * (delay * CHECK_JITTER_FRACTION)
-  return datetime.now(UTC) + delay + jitter
+  return now + delay + jitter
+
 
+def _git(repo_dir: str, *args: str) -> None:
+  """Runs git with the given arguments in the given directory. Raises RuntimeError,
+  including whatever git said about it, on any error."""
+  run("git", "-C", repo_dir, *args)
 
-def clone_or_update_termux_tools_repo() -> None:
-  """Call while in the workdir. We have a recent commit of termux-tools after this
-  returns."""
-  if os.path.exists(TERMUX_TOOLS_REPO):
-    os.chdir(TERMUX_TOOLS_REPO)
-    git("checkout", ".")
-    git("clean", "-dfx")
-    git("pull")
+
+def clone_or_update_termux_tools_repo(workdir: str) -> None:
+  """We have a recent commit of termux-tools in the workdir after this returns.
+
+  We only ever read files out of the latest commit, so that's all we fetch."""
+  repo_dir = os.path.join(workdir, TERMUX_TOOLS_REPO)
+  if os.path.exists(repo_dir):
+    # Nothing local is worth keeping, so just match upstream.
+    _git(repo_dir, "fetch", "--depth=1", "origin", "HEAD")
+    _git(repo_dir, "reset", "--hard", "FETCH_HEAD")
+    _git(repo_dir, "clean", "-dfx")
   else:
-    git("clone", TERMUX_TOOLS_REPO_URL)
-    os.chdir(TERMUX_TOOLS_REPO)
-  os.chdir("..")
+    _git(workdir, "clone", "--depth=1", "--single-branch", TERMUX_TOOLS_REPO_URL)
 
 
-def __load_mirrors_from_file(domain: str, filepath: str) -> MirrorGroup:
-  """Creates Mirrors for each repo in the mirror definition file at the given path."""
+def __load_mirrors_from_file(
+  domain: str, repo_dir: str, mirror_file_path: str
+) -> MirrorGroup:
+  """Creates Mirrors for each repo in the mirror definition file at the given path,
+  relative to the (termux-tools git) repo."""
+  filepath = os.path.join(repo_dir, mirror_file_path)
   mirrors: list[Mirror] = []
   repos: dict[str, str] = {}
   weight = -1
   with open(filepath) as f:
-    for line in f:
-      if line.strip().startswith("#"):
-        continue
-      var, val = line.strip().split("=")
+    text = f.read()
+  for line in _MIRROR_LINE.finditer(text):
+    if unparseable := line["unparseable"]:
+      logging.warning(f"ignoring unparseable line in {filepath}: {unparseable}")
+    elif var := line["var"]:
       match var:
         case "WEIGHT":
-          weight = int(val)
+          weight = int(line["val"])
         case _:
-          repos[var.lower()] = val.strip('"')
+          repos[var.lower()] = line["val"]
 
   for repo_name, repo_url in repos.items():
     mirrors.append(
       Mirror(
         repo_url=repo_url.rstrip("/"),
         repo_name=repo_name,
-        weight=int(weight),
+        weight=weight,
         next_check=datetime.fromtimestamp(0, UTC),
         consecutive_check_failures=0,
         last_check=None,
@@ -145,31 +227,33 @@ def __load_mirrors_from_file(domain: str, filepath: str) -> MirrorGroup:
       )
     )
   logging.debug(f"loaded from {filepath}, mirrors={mirrors}")
-  mirror_file_path = filepath.replace("termux-tools/", "")
   return MirrorGroup(domain, mirror_file_path, mirrors)
 
 
-def _load_mirrors_from_repo() -> list[MirrorGroup]:
+def _load_mirrors_from_repo(workdir: str) -> list[MirrorGroup]:
   """Creates Mirrors in MirrorGroups for each (termux package) repo in the (termux-tools
-  git) repo. Assumes $PWD contains the (termux-tools git) repo."""
+  git) repo in the workdir."""
   mirror_groups: list[MirrorGroup] = []
-  mirror_dir = f"{TERMUX_TOOLS_REPO}/mirrors"
+  repo_dir = os.path.join(workdir, TERMUX_TOOLS_REPO)
+  mirror_dir = os.path.join(repo_dir, "mirrors")
   # It's possible for a domain to appear in multiple regions. Only keep the first when
   # that happens.
   domains_seen: set[str] = set()
   for region in os.listdir(mirror_dir):
-    region_dir = f"{mirror_dir}/{region}"
+    region_dir = os.path.join(mirror_dir, region)
     if not os.path.isdir(region_dir):
       continue
     for domain in os.listdir(region_dir):
       if domain in domains_seen:
         logging.info(f"ignoring duplicate mirror def for domain={domain}")
       else:
-        mirror_file = f"{region_dir}/{domain}"
-        mirror_groups.append(__load_mirrors_from_file(domain, mirror_file))
+        mirror_file_path = f"mirrors/{region}/{domain}"
+        mirror_groups.append(
+          __load_mirrors_from_file(domain, repo_dir, mirror_file_path)
+        )
         domains_seen.add(domain)
 
-  mirror_count = sum([len(m_g.mirrors) for m_g in mirror_groups])
+  mirror_count = sum(len(m_g.mirrors) for m_g in mirror_groups)
   logging.info(
     f"loaded {len(mirror_groups)} mirror groups, {mirror_count} mirrors from repo"
   )
@@ -177,10 +261,12 @@ def _load_mirrors_from_repo() -> list[MirrorGroup]:
   return mirror_groups
 
 
+@cache
 def _get_usable_cache_path() -> str:
   """Returns a path to a cache file, and if it doesn't exist, creates any necessary
-  parent directories for it to be immediately writable."""
-  cache_dir = os.path.expanduser(f"~/.cache/{PROGRAM_NAME}")
+  parent directories for it to be immediately writable. Only does any of that work the
+  first time it's called."""
+  cache_dir = os.path.expanduser(f"~/.cache/{program_name()}")
   os.makedirs(cache_dir, exist_ok=True)
   return f"{cache_dir}/mirror_cache"
 
@@ -202,7 +288,7 @@ def _load_mirrors_from_cache() -> Optional[list[MirrorGroup]]:
 
   # Sanity check the object we loaded so we can fail fast if it's wrong.
   if not isinstance(groups, list) or not all(
-    [isinstance(o, MirrorGroup) for o in groups]
+    isinstance(o, MirrorGroup) for o in groups
   ):
     logging.error(
       "unpickled successfully, but what we unpickled wasn't list[MirrorGroup]: "
@@ -211,47 +297,63 @@ def _load_mirrors_from_cache() -> Optional[list[MirrorGroup]]:
     logging.error("starting fresh")
     return None
 
-  mirror_count = sum([len(g.mirrors) for g in groups])
+  mirror_count = sum(len(g.mirrors) for g in groups)
   logging.info(
     f"loaded {mirror_count} mirrors in {len(groups)} groups from {cache_path}"
   )
   return groups
 
 
-def maybe_write_cache(groups: list[MirrorGroup]) -> None:
+def maybe_write_cache(groups: list[MirrorGroup], force: bool = False) -> None:
   """Write the groups to the cache file if it's time to do so. Whether it's time to do
-  is decided interally by this function."""
+  is decided interally by this function, unless force is set.
+
+  The write is atomic, so a crash mid-write leaves the previous cache intact, and is
+  skipped if the cache would be unchanged."""
+  global _last_cache_write, _last_cache_hash
+  now = datetime.now(UTC)
+  if not force and _last_cache_write and now - _last_cache_write < CACHE_WRITE_INTERVAL:
+    return
+
+  data = pickle.dumps(groups, protocol=pickle.HIGHEST_PROTOCOL)
+  data_hash = hashlib.blake2b(data, digest_size=16).digest()
+  if data_hash == _last_cache_hash:
+    logging.debug("mirror cache unchanged, not writing it")
+    return
+
   cache_path = _get_usable_cache_path()
-  with open(cache_path, "wb") as f:
-    pickle.dump(groups, f)
+  tmp_path = f"{cache_path}.tmp"
+  with open(tmp_path, "wb") as f:
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(tmp_path, cache_path)
+  _last_cache_write = now
+  _last_cache_hash = data_hash
 
 
-def load_mirrors() -> list[MirrorGroup]:
+def load_mirrors(workdir: str) -> list[MirrorGroup]:
   """Creates Mirrors in MirrorGroups for each (termux package) repo in the (termux-tools
-  git) repo, loading all useful info in the mirror cache in the process. Assumes $PWD
-  contains the (termux-tools git) repo."""
-  from_repo = _load_mirrors_from_repo()
+  git) repo in the workdir, loading all useful info in the mirror cache in the
+  process."""
+  from_repo = _load_mirrors_from_repo(workdir)
   if not (from_cache := _load_mirrors_from_cache()):
     return from_repo
 
-  def mirror_map(groups: list[MirrorGroup]) -> dict[str, Mirror]:
-    """Returns a map from URLs to Mirrors corresponding to the given list of
-    MirrorGroups."""
-    return {m.repo_url: m for m in chain.from_iterable([g.mirrors for g in groups])}
-
-  repo_map = mirror_map(from_repo)
-  cache_map = mirror_map(from_cache)
-
-  for url, repo_mirror in repo_map.items():
-    if cache_mirror := cache_map.get(url):
-      repo_mirror.update_from(cache_mirror)
-    # Set a first update time in the near future, overriding anything in the cache.
-    repo_mirror.next_check = next_check_time(INITIAL_CHECK_DELAY)
+  cache_map = {m.repo_url: m for g in from_cache for m in g.mirrors}
+  mirrors_added: list[str] = []
+  now = datetime.now(UTC)
+  for group in from_repo:
+    for repo_mirror in group.mirrors:
+      # Popping matches leaves only the cached mirrors that have since been removed.
+      if cache_mirror := cache_map.pop(repo_mirror.repo_url, None):
+        repo_mirror.update_from(cache_mirror)
+      else:
+        mirrors_added.append(repo_mirror.repo_url)
+      # Set a first update time in the near future, overriding anything in the cache.
+      repo_mirror.next_check = next_check_time(INITIAL_CHECK_DELAY, now)
 
-  repo_urls = set(repo_map.keys())
-  cache_urls = set(cache_map.keys())
-  mirrors_added = repo_urls - cache_urls
-  mirrors_removed = cache_urls - repo_urls
+  mirrors_removed = list(cache_map.keys())
   logging.info(
     f"merged cache, {len(mirrors_added)} mirrors added, {len(mirrors_removed)} "
     "removed since last cache update"
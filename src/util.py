@@ -1,9 +1,35 @@
+import os
 import os.path
+import subprocess
 import sys
 from datetime import timedelta
+from functools import cache
+from typing import Optional
 
 
-PROGRAM_NAME = os.path.basename(sys.argv[0]).rstrip(".py")
+@cache
+def program_name() -> str:
+  """Return the name this program was run as, without any .py suffix."""
+  return os.path.basename(sys.argv[0]).removesuffix(".py")
+
+
+def run(*args: str, env: Optional[dict[str, str]] = None) -> str:
+  """Runs a command and returns its output. Raises RuntimeError with the command's
+  error output if it fails.
+
+  Any env entries are added to this process's environment rather than replacing it."""
+  try:
+    # fmt: off
+    return subprocess.run(
+      args,
+      check=True, capture_output=True, text=True,
+      env={**os.environ, **env} if env else None,
+    ).stdout
+    # fmt: on
+  except subprocess.CalledProcessError as e:
+    # Some commands report failures on stdout, so fall back to it.
+    output = (e.stderr or e.stdout or "").strip()
+    raise RuntimeError(f"{' '.join(args)} failed: {output}") from e
 
 
 def doc_url(doc_name: str) -> str: